@@ -1,30 +1,105 @@
-import pandas as pd
+import os
+import shutil
+import tempfile
+import numpy as np
 import xgboost as xgb
 import streamlit as st
 import traceback
 import plotly.graph_objects as go
-# Wrap sentiment import in try-except to handle potential errors
 try:
-    from sentiment import sentiment_analysis, public_sentiment
-except ImportError as e:
-    print(f"Error importing sentiment module: {e}")
+    import tl2cgen
+except ImportError:
+    print("TL2cgen not installed, falling back to XGBoost for predictions")
+    tl2cgen = None
+
+# Feature columns in the order the model was trained on
+FEATURE_ORDER = (
+    "LIMIT_BAL", "PAY_0", "PAY_2", "PAY_3", "PAY_4", "PAY_5", "PAY_6",
+    "BILL_AMT1", "BILL_AMT2", "BILL_AMT3", "BILL_AMT4", "BILL_AMT5", "BILL_AMT6",
+    "PAY_AMT1", "PAY_AMT2", "PAY_AMT3", "PAY_AMT4", "PAY_AMT5", "PAY_AMT6",
+)
+BILL_KEYS = ("BILL_AMT1", "BILL_AMT2", "BILL_AMT3", "BILL_AMT4", "BILL_AMT5", "BILL_AMT6")
+PAY_KEYS = ("PAY_AMT1", "PAY_AMT2", "PAY_AMT3", "PAY_AMT4", "PAY_AMT5", "PAY_AMT6")
+
+MODEL_PATH = "centseek_model.json"
+# Compiled from MODEL_PATH by compile_model.py
+LIBRARY_PATH = "./centseek_model.so"
+
+# Batches at least this large are spread across all cores; smaller ones stay single-threaded
+PARALLEL_BATCH_SIZE = 256
+
+
+def file_mtime(path):
+    """Modification time of a model file, used as a cache key so a retrained model is picked up"""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
 
 
-    def sentiment_analysis():
-        return {"label": "NEUTRAL", "score": 0.5, "message": "Sentiment analysis module not available"}
+def read_model(nthread):
+    """Read the XGBoost model from MODEL_PATH, predicting with nthread threads"""
+    m = xgb.Booster()
+    m.load_model(MODEL_PATH)
+    m.set_param({"nthread": nthread})
+    return m
 
 
-    def public_sentiment():
-        return "Sentiment analysis module not available"
+@st.cache_resource(max_entries=1)
+def load_model(model_version):
+    """Load the single-threaded XGBoost model once per version of the model file"""
+    try:
+        m = read_model(1)
+        print("Model loaded successfully")
+        return m
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        st.error(f"Error loading model: {e}")
+        return None
 
-model = xgb.Booster()
-try:
-    model.load_model("centseek_model.json")
-    print("Model loaded successfully")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    st.error(f"Error loading model: {e}")
-    model = None
+
+@st.cache_resource(max_entries=1)
+def load_batch_model(model_version):
+    """Load a separate copy of the model for large batches, predicting on every core"""
+    try:
+        # -1 lets XGBoost pick the thread count, respecting CPU affinity and cgroup limits
+        return read_model(-1)
+    except Exception as e:
+        print(f"Error loading batch model: {e}")
+        return None
+
+
+@st.cache_resource(max_entries=1)
+def load_predictor(library_version, model_version):
+    """Load the compiled model produced by compile_model.py, if available and up to date"""
+    if tl2cgen is None:
+        return None
+    if library_version is not None and model_version is not None and library_version < model_version:
+        print(f"{LIBRARY_PATH} is older than {MODEL_PATH}, falling back to XGBoost. Re-run compile_model.py")
+        return None
+    # The dynamic loader hands back an already-open library with the same path, so a recompiled
+    # model would keep the old code. Load each build from its own copy instead; the copy can be
+    # removed once loaded since the library stays mapped in memory.
+    fd, library_copy = tempfile.mkstemp(prefix="centseek_model-", suffix=".so")
+    os.close(fd)
+    try:
+        shutil.copyfile(LIBRARY_PATH, library_copy)
+        p = tl2cgen.Predictor(library_copy, nthread=1)
+        print("Compiled model loaded successfully")
+        return p
+    except Exception as e:
+        print(f"Compiled model not available, falling back to XGBoost: {e}")
+        return None
+    finally:
+        try:
+            os.remove(library_copy)
+        except OSError:
+            pass
+
+
+model = load_model(file_mtime(MODEL_PATH))
+# Compiled model is used for predictions when available
+predictor = load_predictor(file_mtime(LIBRARY_PATH), file_mtime(MODEL_PATH))
 
 if 'form_submitted' not in st.session_state:
     st.session_state.form_submitted = False
@@ -38,6 +113,23 @@ if 'params' not in st.session_state:
     st.session_state.params = None
 
 
+def score_batch(rows):
+    """Default probabilities for an (N, 19) float32 array of customers in FEATURE_ORDER"""
+    rows = np.asarray(rows, dtype=np.float32)
+    if predictor is not None and (model is None or len(rows) < PARALLEL_BATCH_SIZE):
+        return predictor.predict(tl2cgen.DMatrix(rows)).reshape(len(rows), -1)[:, 0]
+    if model is None:
+        raise RuntimeError("Model not loaded. Cannot make predictions.")
+    if len(rows) < PARALLEL_BATCH_SIZE:
+        return model.inplace_predict(rows)
+
+    # Large batches amortize the thread start-up cost, so use the copy of the model that runs on every core
+    batch_model = load_batch_model(file_mtime(MODEL_PATH))
+    if batch_model is None:
+        return model.inplace_predict(rows)
+    return batch_model.inplace_predict(rows)
+
+
 def eval_risk(p_default):
     """Evaluate risk based on default probability"""
     msg = ""
@@ -51,13 +143,19 @@ def eval_risk(p_default):
     st.metric("Default Probability", f"{p_default:.2%}", msg)
 
 
+@st.cache_data(max_entries=1)
+def _importance_data(model_version):
+    """Top 10 features by gain, computed once per version of the model file"""
+    importance = model.get_score(importance_type='gain')  # Get feature importance
+    return sorted(importance.items(), key=lambda x: x[1], reverse=True)[:10]
+
+
 def plot_feature_importance():
     if model is None:
         st.error("Model not available for feature importance analysis")
         return
 
-    importance = model.get_score(importance_type='gain')  # Get feature importance
-    sorted_importance = sorted(importance.items(), key=lambda x: x[1], reverse=True)[:10]
+    sorted_importance = _importance_data(file_mtime(MODEL_PATH))
 
     fig = go.Figure(go.Bar(
         x=[x[1] for x in sorted_importance],
@@ -69,6 +167,44 @@ def plot_feature_importance():
     st.plotly_chart(fig)
 
 
+@st.cache_data(max_entries=128)
+def _risk_profile_stats(customer_items):
+    """Summary statistics for the radar chart, keyed on the submitted (feature, value) pairs"""
+    customer_data = dict(customer_items)
+
+    # Calculate average bill and payment amounts
+    bill_amounts = np.fromiter(
+        (customer_data.get(k, 0) for k in BILL_KEYS), dtype=np.float64, count=6
+    )
+    avg_bill = float(bill_amounts.mean())
+
+    payment_amounts = np.fromiter(
+        (customer_data.get(k, 0) for k in PAY_KEYS), dtype=np.float64, count=6
+    )
+    avg_payment = float(payment_amounts.mean())
+
+    # Find maximum payment delay
+    payment_delays = np.fromiter(
+        (int(customer_data[f"PAY_{i}"]) for i in range(7) if f"PAY_{i}" in customer_data), dtype=np.int64
+    )
+    max_delay = int(payment_delays.max()) if payment_delays.size else 0
+
+    # Get credit limit
+    credit_limit = float(customer_data.get("LIMIT_BAL", 0))
+
+    # Create normalized values for better visualization
+    # Scale values to a range that works well for radar chart
+    max_credit_limit = 100000  # Assumed maximum credit limit for scaling
+
+    values = [
+        min(credit_limit / max_credit_limit * 10, 10),  # Scale credit limit
+        min(avg_bill / max_credit_limit * 10, 10),  # Scale average bill
+        min(avg_payment / max_credit_limit * 10, 10),  # Scale average payment
+        min(max_delay, 9)  # Payment delay already in range 0-9
+    ]
+    return credit_limit, avg_bill, avg_payment, max_delay, values
+
+
 def plot_radar_chart(customer_data):
     if not customer_data:
         st.error("No customer data available for radar chart")
@@ -79,118 +215,95 @@ def plot_radar_chart(customer_data):
 
     # Calculate the values with proper error handling
     try:
-        # Calculate average bill amount
-        bill_amounts = [
-            float(customer_data.get(f"BILL_AMT{i}", 0))
-            for i in range(1, 7)
-        ]
-        avg_bill = sum(bill_amounts) / len(bill_amounts) if len(bill_amounts) > 0 else 0
-
-        # Calculate average payment amount
-        payment_amounts = [
-            float(customer_data.get(f"PAY_AMT{i}", 0))
-            for i in range(1, 7)
-        ]
-        avg_payment = sum(payment_amounts) / len(payment_amounts) if len(payment_amounts) > 0 else 0
-
-        # Find maximum payment delay
-        payment_delays = [
-            int(customer_data.get(f"PAY_{i}", 0))
-            for i in range(7)
-            if f"PAY_{i}" in customer_data
-        ]
-        max_delay = max(payment_delays) if payment_delays else 0
-
-        # Get credit limit
-        credit_limit = float(customer_data.get("LIMIT_BAL", 0))
-
-        # Create normalized values for better visualization
-        # Scale values to a range that works well for radar chart
-        max_credit_limit = 100000  # Assumed maximum credit limit for scaling
-
-        values = [
-            min(credit_limit / max_credit_limit * 10, 10),  # Scale credit limit
-            min(avg_bill / max_credit_limit * 10, 10),  # Scale average bill
-            min(avg_payment / max_credit_limit * 10, 10),  # Scale average payment
-            min(max_delay, 9)  # Payment delay already in range 0-9
-        ]
-
-        # Create the radar chart
-        fig = go.Figure()
-        fig.add_trace(go.Scatterpolar(
-            r=values,
-            theta=categories,
-            fill='toself',
-            name="Customer Risk Profile",
-            marker=dict(color="rgba(31, 119, 180, 0.8)"),
-            line=dict(color="rgba(31, 119, 180, 1)")
-        ))
-
-        # Update layout with better formatting
-        fig.update_layout(
-            title="Customer Risk Profile",
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, 10]
-                )
-            ),
-            showlegend=True
+        credit_limit, avg_bill, avg_payment, max_delay, values = _risk_profile_stats(
+            tuple(customer_data.items())
         )
+    except Exception as e:
+        st.error(f"Error generating radar chart: {e}")
+        st.code(traceback.format_exc())
+        return
 
-        # Display summary statistics alongside the chart
-        col1, col2 = st.columns([3, 2])
+    # Create the radar chart
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=values,
+        theta=categories,
+        fill='toself',
+        name="Customer Risk Profile",
+        marker=dict(color="rgba(31, 119, 180, 0.8)"),
+        line=dict(color="rgba(31, 119, 180, 1)")
+    ))
 
-        with col1:
-            st.plotly_chart(fig)
+    # Update layout with better formatting
+    fig.update_layout(
+        title="Customer Risk Profile",
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 10]
+            )
+        ),
+        showlegend=True
+    )
+
+    # Display summary statistics alongside the chart
+    col1, col2 = st.columns([3, 2])
 
-        with col2:
-            st.subheader("Risk Profile Summary")
-            st.write(f"Credit Limit: ${credit_limit:,.2f}")
-            st.write(f"Average Monthly Bill: ${avg_bill:,.2f}")
-            st.write(f"Average Monthly Payment: ${avg_payment:,.2f}")
-            st.write(f"Maximum Payment Delay: {max_delay} month(s)")
+    with col1:
+        st.plotly_chart(fig)
 
-            # Calculate and display bill-to-payment ratio
-            if avg_payment > 0:
-                bill_payment_ratio = avg_bill / avg_payment
-                st.write(f"Bill-to-Payment Ratio: {bill_payment_ratio:.2f}")
+    with col2:
+        st.subheader("Risk Profile Summary")
+        st.write(f"Credit Limit: ${credit_limit:,.2f}")
+        st.write(f"Average Monthly Bill: ${avg_bill:,.2f}")
+        st.write(f"Average Monthly Payment: ${avg_payment:,.2f}")
+        st.write(f"Maximum Payment Delay: {max_delay} month(s)")
 
-                if bill_payment_ratio > 2:
-                    st.warning("⚠️ Bill amounts significantly exceed payments")
-                elif bill_payment_ratio < 0.8:
-                    st.success("✅ Payments exceed bill amounts")
+        # Calculate and display bill-to-payment ratio
+        if avg_payment > 0:
+            bill_payment_ratio = avg_bill / avg_payment
+            st.write(f"Bill-to-Payment Ratio: {bill_payment_ratio:.2f}")
 
-    except Exception as e:
-        st.error(f"Error generating radar chart: {e}")
-        st.code(traceback.format_exc())
+            if bill_payment_ratio > 2:
+                st.warning("⚠️ Bill amounts significantly exceed payments")
+            elif bill_payment_ratio < 0.8:
+                st.success("✅ Payments exceed bill amounts")
 
 
 def run_sentiment_analysis():
     """Run and display sentiment analysis results"""
+    # Imported here so reruns that never open this view skip the sentiment dependencies
     try:
-        with st.spinner("Analyzing market sentiment..."):
-            result = sentiment_analysis()
-
-        # Display sentiment message
-        st.info(f"**Market Sentiment**: {result.get('message', 'No message available')}")
+        from sentiment import sentiment_analysis
+    except ImportError as e:
+        print(f"Error importing sentiment module: {e}")
 
-        # Display sentiment score with appropriate color
-        sentiment_score = result.get('score', 0.5)
-        sentiment_label = result.get('label', 'NEUTRAL')
-
-        # Create color-coded display
-        color = "green" if sentiment_label == "POSITIVE" else "red" if sentiment_label == "NEGATIVE" else "gray"
-        st.markdown(f"""
-        <div style="padding: 10px; border-radius: 5px; background-color: {color}20;">
-            <h3 style="color: {color};">{sentiment_label}</h3>
-            <p>Confidence: {sentiment_score:.2%}</p>
-        </div>
-        """, unsafe_allow_html=True)
+        def sentiment_analysis():
+            return {"label": "NEUTRAL", "score": 0.5, "message": "Sentiment analysis module not available"}
 
+    try:
+        with st.spinner("Analyzing market sentiment..."):
+            result = sentiment_analysis()
     except Exception as e:
         st.error(f"Error in sentiment analysis: {e}")
         st.code(traceback.format_exc())
+        return
+
+    # Display sentiment message
+    st.info(f"**Market Sentiment**: {result.get('message', 'No message available')}")
+
+    # Display sentiment score with appropriate color
+    sentiment_score = result.get('score', 0.5)
+    sentiment_label = result.get('label', 'NEUTRAL')
+
+    # Create color-coded display
+    color = "green" if sentiment_label == "POSITIVE" else "red" if sentiment_label == "NEGATIVE" else "gray"
+    st.markdown(f"""
+    <div style="padding: 10px; border-radius: 5px; background-color: {color}20;">
+        <h3 style="color: {color};">{sentiment_label}</h3>
+        <p>Confidence: {sentiment_score:.2%}</p>
+    </div>
+    """, unsafe_allow_html=True)
 
 
 def submit_form():
@@ -292,28 +405,25 @@ if not st.session_state.form_submitted:
         # Store params in session state for radar chart
         st.session_state.params = params
 
-        # First check if model is loaded
-        if model is None:
+        bill_sum = sum(params[k] for k in BILL_KEYS)
+        paid_sum = sum(params[k] for k in PAY_KEYS)
+
+        # Bills fully paid off carry no default risk, so skip the model entirely
+        if bill_sum <= paid_sum:
+            st.session_state.prediction = 0.0
+            submit_form()
+            st.rerun()
+        # Otherwise check if model is loaded
+        elif predictor is None and model is None:
             st.error("Model not loaded. Cannot make predictions.")
             st.session_state.prediction = None
         else:
             try:
                 # Make prediction
-                input_df = pd.DataFrame(params, index=[0])
-                predictor = xgb.DMatrix(input_df)
-                prediction_result = model.predict(predictor)
+                features = np.array([[params[k] for k in FEATURE_ORDER]], dtype=np.float32)
+                prediction_result = score_batch(features)
                 if len(prediction_result) > 0:
-                    bill_sum = 0
-                    paid_sum = 0
-                    for key, amt in st.session_state.params.items():
-                        if key[:4] == "BILL":
-                            bill_sum += amt
-                        elif len(key) >= 5 and key[:7] == "PAY_AMT":
-                            paid_sum += amt
-                    if bill_sum <= paid_sum:
-                        st.session_state.prediction = 0
-                    else:
-                        st.session_state.prediction = float(prediction_result[0])
+                    st.session_state.prediction = float(prediction_result[0])
                 else:
                     st.error("Prediction returned empty result")
                     st.session_state.prediction = None
@@ -0,0 +1,31 @@
+"""Compile centseek_model.json into a native shared library for fast inference.
+
+Run once after (re)training the model:
+
+    python compile_model.py
+
+This produces centseek_model.so, which app.py loads with TL2cgen's Predictor
+instead of going through XGBoost's DMatrix/predict path for every submission.
+"""
+import treelite
+import tl2cgen
+
+MODEL_PATH = "centseek_model.json"
+LIBRARY_PATH = "./centseek_model.so"
+
+
+def compile_model():
+    """Load the XGBoost JSON model with Treelite and compile it with gcc"""
+    model = treelite.frontend.load_xgboost_model(MODEL_PATH)
+    tl2cgen.export_lib(
+        model,
+        toolchain="gcc",
+        libpath=LIBRARY_PATH,
+        params={"parallel_comp": 0},
+        verbose=True
+    )
+    print(f"Compiled model written to {LIBRARY_PATH}")
+
+
+if __name__ == "__main__":
+    compile_model()
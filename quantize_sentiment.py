@@ -0,0 +1,37 @@
+"""Export the DistilBERT sentiment model to ONNX and quantize it to int8.
+
+Run once (requires optimum[onnxruntime]):
+
+    python quantize_sentiment.py
+
+This writes the distilbert-int8/ directory, which sentiment.py loads with ONNX Runtime
+instead of the float32 transformers pipeline.
+"""
+import os
+
+from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+from transformers import AutoTokenizer
+
+MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+# Next to this script, where sentiment.py looks for it regardless of the working directory
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "distilbert-int8")
+
+
+def quantize_sentiment_model():
+    """Export the model to ONNX, apply dynamic int8 quantization and save the tokenizer alongside"""
+    model = ORTModelForSequenceClassification.from_pretrained(MODEL_NAME, export=True)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+
+    quantizer = ORTQuantizer.from_pretrained(model)
+    quantization_config = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    quantizer.quantize(save_dir=EXPORT_DIR, quantization_config=quantization_config)
+
+    # sentiment.py reads tokenizer.json and the label names from config.json
+    tokenizer.save_pretrained(EXPORT_DIR)
+    model.config.save_pretrained(EXPORT_DIR)
+    print(f"Quantized sentiment model written to {EXPORT_DIR}")
+
+
+if __name__ == "__main__":
+    quantize_sentiment_model()
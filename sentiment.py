@@ -1,6 +1,9 @@
+import json
 import os
+import re
 from pathlib import Path
 import sys
+import streamlit as st
 from streamlit import secrets
 
 # Try to import dependencies with better error handling
@@ -15,24 +18,86 @@ except ImportError:
         print("Warning: python-dotenv not available, using environment variables only")
         return False
 
-try:
-    import google.generativeai as genai
-except ImportError:
-    print("Google Generative AI package not installed. Install with: pip install google-generativeai")
+# Word lists for the rule-based fallback, compiled once into a single pattern each
+positive_words = ["growth", "positive", "increasing", "recovery", "optimistic",
+                  "bullish", "confident", "strong", "robust", "improving"]
+negative_words = ["recession", "decline", "crisis", "negative", "bearish",
+                  "downturn", "pessimistic", "weak", "struggling", "inflation"]
+positive_pattern = re.compile("|".join(map(re.escape, positive_words)))
+negative_pattern = re.compile("|".join(map(re.escape, negative_words)))
+
+# int8 ONNX export of the sentiment model, produced by quantize_sentiment.py
+ONNX_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "distilbert-int8")
+
+
+def load_onnx_pipeline():
+    """Load the quantized ONNX model and return a callable matching the transformers pipeline output"""
+    import numpy as np
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+
+    # Inputs are a single short sentence, so extra threads only add overhead
+    sess_options = ort.SessionOptions()
+    sess_options.intra_op_num_threads = 1
+    session = ort.InferenceSession(
+        os.path.join(ONNX_MODEL_DIR, "model_quantized.onnx"),
+        sess_options=sess_options,
+        providers=["CPUExecutionProvider"]
+    )
+
+    tokenizer = Tokenizer.from_file(os.path.join(ONNX_MODEL_DIR, "tokenizer.json"))
+    tokenizer.enable_truncation(max_length=512)
+    with open(os.path.join(ONNX_MODEL_DIR, "config.json")) as f:
+        id2label = {int(i): label for i, label in json.load(f)["id2label"].items()}
+
+    def sentiment_analyzer(text):
+        encoding = tokenizer.encode(text)
+        logits = session.run(None, {
+            "input_ids": np.array([encoding.ids], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask], dtype=np.int64),
+        })[0][0]
+
+        # Softmax over the two classes
+        scores = np.exp(logits - logits.max())
+        scores /= scores.sum()
+        best = int(scores.argmax())
+        return [{"label": id2label[best], "score": float(scores[best])}]
+
+    return sentiment_analyzer
+
+
+@st.cache_resource
+def load_sentiment_pipeline():
+    """Load the sentiment analysis pipeline once per process
+
+    Prefers the int8 ONNX model when it has been exported, falling back to transformers.
+    Raises on failure so that nothing is cached and the next call tries again.
+    """
+    if os.path.isdir(ONNX_MODEL_DIR):
+        try:
+            sentiment_analyzer = load_onnx_pipeline()
+            print("Successfully loaded quantized ONNX sentiment model")
+            return sentiment_analyzer
+        except ImportError as e:
+            print(f"Missing dependency for the ONNX sentiment model: {str(e)}. Install with: pip install onnxruntime tokenizers")
+        except Exception as e:
+            print(f"Error loading ONNX sentiment model: {str(e)}")
+
+    from transformers import pipeline
+    # Explicitly set a model for consistent results
+    sentiment_analyzer = pipeline(
+        "sentiment-analysis",
+        model="distilbert-base-uncased-finetuned-sst-2-english",
+        return_all_scores=False
+    )
+    print("Successfully loaded sentiment analysis pipeline")
+    return sentiment_analyzer
 
 
 def get_sentiment_pipeline():
-    """Initialize and return the sentiment analysis pipeline from transformers"""
+    """Return the sentiment analysis pipeline, or None if it could not be loaded"""
     try:
-        from transformers import pipeline
-        # Explicitly set a model for consistent results
-        sentiment_analyzer = pipeline(
-            "sentiment-analysis",
-            model="distilbert-base-uncased-finetuned-sst-2-english",
-            return_all_scores=False
-        )
-        print("Successfully loaded sentiment analysis pipeline")
-        return sentiment_analyzer
+        return load_sentiment_pipeline()
     except ImportError:
         print("Transformers library not installed. Install with: pip install transformers")
         return None
@@ -42,7 +107,19 @@ def get_sentiment_pipeline():
 
 
 
+# Set once a key has been found, so later calls skip the filesystem search
+found_api_key = None
+
+
 def get_api_key():
+    """Return the API key, searching for it until one is found"""
+    global found_api_key
+    if found_api_key is None:
+        found_api_key = find_api_key()
+    return found_api_key
+
+
+def find_api_key():
     """Attempt multiple methods to get the API key"""
     # First, try direct environment variable
     api_key = os.environ.get("GOOGLE_API_KEY")
@@ -80,7 +157,6 @@ def get_api_key():
 
     # Final attempt - check project root (where streamlit is run from)
     try:
-        import streamlit as st
         streamlit_dir = os.path.dirname(os.path.abspath(st.__file__))
         streamlit_env_path = os.path.join(streamlit_dir, '.env')
         if os.path.exists(streamlit_env_path):
@@ -95,6 +171,30 @@ def get_api_key():
     return None
 
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_public_sentiment(api_key):
+    """Ask Gemini for the current economic sentiment, cached for an hour
+
+    Raises on failure, so errors are never cached and the next call tries again.
+    """
+    # Imported here as the client library is slow to import and only needed on a cache miss
+    import google.generativeai as genai
+
+    prompt = "Summarize the current state of the global economy and general public sentiment in one to two sentences."
+
+    # Configure the generative AI client
+    genai.configure(api_key=api_key)
+
+    # Create a model object
+    model = genai.GenerativeModel('gemini-1.5-flash')
+
+    # Generate the content
+    response = model.generate_content(prompt)
+
+    # Return the text content
+    return response.text
+
+
 def public_sentiment():
     """Fetch current economic sentiment from Google's Gemini model"""
     api_key = get_api_key()
@@ -103,25 +203,23 @@ def public_sentiment():
         print("No API key found after trying multiple locations")
         return "No API key found. Economic sentiment unavailable."
 
-    prompt = "Summarize the current state of the global economy and general public sentiment in one to two sentences."
-
     try:
-        # Configure the generative AI client
-        genai.configure(api_key=api_key)
-
-        # Create a model object
-        model = genai.GenerativeModel('gemini-1.5-flash')
-
-        # Generate the content
-        response = model.generate_content(prompt)
-
-        # Return the text content
-        return response.text
+        return fetch_public_sentiment(api_key)
+    except ImportError:
+        print("Google Generative AI package not installed. Install with: pip install google-generativeai")
+        return "Error fetching sentiment: google-generativeai not installed"
     except Exception as e:
         print(f"Error in public_sentiment(): {e}")
         return f"Error fetching sentiment: {str(e)}"
 
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def classify_text(_sentiment_pipeline, text):
+    """Run the sentiment pipeline on text, cached for an hour per text"""
+    result = _sentiment_pipeline(text)
+    return result[0].copy() if result else {"label": "NEUTRAL", "score": 0.5}
+
+
 def sentiment_analysis():
     """Analyzes the current market sentiments with NLP"""
     try:
@@ -137,14 +235,10 @@ def sentiment_analysis():
 
         if sentiment_pipeline is None:
             # Fallback: Simple rule-based sentiment analysis
-            positive_words = ["growth", "positive", "increasing", "recovery", "optimistic",
-                              "bullish", "confident", "strong", "robust", "improving"]
-            negative_words = ["recession", "decline", "crisis", "negative", "bearish",
-                              "downturn", "pessimistic", "weak", "struggling", "inflation"]
-
+            # Count each distinct word once, in a single pass over the text per pattern
             text_lower = text.lower()
-            pos_count = sum(1 for word in positive_words if word in text_lower)
-            neg_count = sum(1 for word in negative_words if word in text_lower)
+            pos_count = len(set(positive_pattern.findall(text_lower)))
+            neg_count = len(set(negative_pattern.findall(text_lower)))
 
             if pos_count > neg_count:
                 return {"label": "POSITIVE", "score": 0.5 + (pos_count / (pos_count + neg_count + 1)) * 0.5,
@@ -154,11 +248,8 @@ def sentiment_analysis():
                         "message": text}
             return {"label": "NEUTRAL", "score": 0.5, "message": text}
 
-        # If transformers is available, use it
-        result = sentiment_pipeline(text)
-
-        # Return the first result with the original text
-        result_with_text = result[0].copy() if result else {"label": "NEUTRAL", "score": 0.5}
+        # If transformers is available, use it and return the first result with the original text
+        result_with_text = classify_text(sentiment_pipeline, text)
         result_with_text["message"] = text
         return result_with_text
 